@@ -1,6 +1,11 @@
 import json
 import logging
+import math
 import os
+import queue
+import threading
+import time
+from collections import deque
 
 from dotenv import load_dotenv
 
@@ -8,6 +13,8 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+LATENCY_FILE = "openrouter_latency.json"
+
 CATEGORY_ALIAS_MAP = {
     "국민연금 조직": "국민연금 조직",
     "운용성과": "운용성과",
@@ -78,6 +85,177 @@ def get_positive_float_env(name: str, default: float) -> float:
         return default
 
 
+def get_bool_env(name: str, default: bool) -> bool:
+    raw_value = os.getenv(name)
+    if not raw_value:
+        return default
+    return raw_value.strip().lower() not in ("0", "false", "no", "off")
+
+
+def get_ratio_env(name: str, default: float) -> float:
+    value = get_positive_float_env(name, default)
+    if value > 1:
+        logger.warning("%s 값이 1보다 커서 기본값 %s를 사용합니다: %s", name, default, value)
+        return default
+    return value
+
+
+def get_percent_env(name: str, default: float) -> float:
+    value = get_positive_float_env(name, default)
+    if value > 100:
+        logger.warning("%s 값이 100보다 커서 기본값 %s를 사용합니다: %s", name, default, value)
+        return default
+    return value
+
+
+def get_model_list() -> list[str]:
+    models = [os.getenv("OPENROUTER_MODEL", "openai/gpt-4o-mini")]
+    for model in os.getenv("OPENROUTER_FALLBACK_MODELS", "").split(","):
+        model = model.strip()
+        if model and model not in models:
+            models.append(model)
+    return models
+
+
+def percentile(values: list[float], percent: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class ModelRouter:
+    """모델별 지연 시간과 오류율을 추적해 헤지 대기 시간과 서킷 브레이커 상태를 정합니다."""
+
+    def __init__(
+        self,
+        models: list[str],
+        hedge_percentile: float,
+        hedge_default_delay: float,
+        breaker_error_rate: float,
+        breaker_cooldown: float,
+        window: int = 20,
+        min_samples: int = 5,
+        latency_window: int = 100,
+    ):
+        self.models = models
+        self.hedge_percentile = hedge_percentile
+        self.hedge_default_delay = hedge_default_delay
+        self.breaker_error_rate = breaker_error_rate
+        self.breaker_cooldown = breaker_cooldown
+        self.min_samples = min_samples
+        self._latencies = {model: deque(maxlen=latency_window) for model in models}
+        self._outcomes = {model: deque(maxlen=window) for model in models}
+        self._open_until = {model: 0.0 for model in models}
+        self._lock = threading.Lock()
+        self._latencies_changed = False
+
+    def available_models(self) -> list[str]:
+        now = time.monotonic()
+        with self._lock:
+            return [model for model in self.models if self._open_until[model] <= now]
+
+    def hedge_delay(self, model: str) -> float:
+        with self._lock:
+            latencies = list(self._latencies[model])
+        if len(latencies) < self.min_samples:
+            return self.hedge_default_delay
+        return percentile(latencies, self.hedge_percentile)
+
+    def record_success(self, model: str, latency: float) -> None:
+        with self._lock:
+            self._latencies[model].append(latency)
+            self._outcomes[model].append(True)
+            self._latencies_changed = True
+
+    def record_failure(self, model: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            outcomes = self._outcomes[model]
+            outcomes.append(False)
+            if len(outcomes) < self.min_samples or self._open_until[model] > now:
+                return
+            # 차단이 풀린 뒤에도 최근 실패 기록이 남아 있어 다시 실패하면 곧바로 재차단됩니다.
+            error_rate = outcomes.count(False) / len(outcomes)
+            if error_rate >= self.breaker_error_rate:
+                self._open_until[model] = now + self.breaker_cooldown
+                logger.warning(
+                    "OpenRouter 서킷 브레이커 차단: model=%s error_rate=%.2f cooldown=%ss",
+                    model,
+                    error_rate,
+                    self.breaker_cooldown,
+                )
+
+    def load_latencies(self, path: str) -> None:
+        """이전 실행에서 저장한 모델별 응답 시간 기록을 불러옵니다."""
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                saved = json.load(file)["latencies"]
+            restored = {model: [float(value) for value in saved[model]] for model in self.models if model in saved}
+        except (OSError, ValueError, TypeError, KeyError) as error:
+            logger.warning("OpenRouter 응답 시간 기록을 읽지 못해 무시합니다: file=%s error=%s", path, error)
+            return
+
+        # 차단 상태는 cooldown이 실행 간격보다 짧아 저장하지 않고 응답 시간만 이어 갑니다.
+        with self._lock:
+            for model, values in restored.items():
+                self._latencies[model].extend(values)
+
+    def save_latencies(self, path: str) -> None:
+        with self._lock:
+            if not self._latencies_changed:
+                return
+            latencies = {model: [round(value, 3) for value in values] for model, values in self._latencies.items() if values}
+            self._latencies_changed = False
+
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"latencies": latencies}, file, ensure_ascii=False, indent=2)
+            file.write("\n")
+
+    def log_latency_summary(self) -> None:
+        with self._lock:
+            latencies = {model: list(values) for model, values in self._latencies.items()}
+        for model, values in latencies.items():
+            if not values:
+                continue
+            logger.info(
+                "OpenRouter 모델 지연 시간: model=%s requests=%s p50=%.2fs p95=%.2fs p99=%.2fs",
+                model,
+                len(values),
+                percentile(values, 50),
+                percentile(values, 95),
+                percentile(values, 99),
+            )
+
+
+def build_model_router() -> ModelRouter:
+    router = ModelRouter(
+        models=get_model_list(),
+        hedge_percentile=get_percent_env("OPENROUTER_HEDGE_PERCENTILE", 95.0),
+        hedge_default_delay=get_positive_float_env("OPENROUTER_HEDGE_DELAY", 20.0),
+        breaker_error_rate=get_ratio_env("OPENROUTER_BREAKER_ERROR_RATE", 0.5),
+        breaker_cooldown=get_positive_float_env("OPENROUTER_BREAKER_COOLDOWN", 120.0),
+    )
+    router.load_latencies(os.getenv("OPENROUTER_LATENCY_FILE", LATENCY_FILE))
+    return router
+
+
+_model_router = None
+_model_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """프로세스 전체에서 같은 라우터를 써서 report가 바뀌어도 응답 시간과 차단 상태를 이어 갑니다."""
+    global _model_router
+    with _model_router_lock:
+        if _model_router is None:
+            _model_router = build_model_router()
+        return _model_router
+
+
 def normalize_analysis_item(item: dict | None) -> dict:
     if not isinstance(item, dict):
         return {
@@ -109,6 +287,100 @@ def _build_prompt(prompt_template: str, comments: list) -> str:
     return f"{prompt_template}{strict_rules}\n\n댓글 목록: {json.dumps(comments, ensure_ascii=False)}"
 
 
+def _parse_analysis_content(content: str, expected_count: int) -> list:
+    result_dict = json.loads(content)
+    if not isinstance(result_dict, dict) or not isinstance(result_dict.get("data"), list):
+        raise ValueError("JSON에 리스트 형태의 'data' 키가 없습니다.")
+    if len(result_dict["data"]) != expected_count:
+        raise ValueError(f"반환 개수 불일치: expected={expected_count}, actual={len(result_dict['data'])}")
+    return [normalize_analysis_item(item) for item in result_dict["data"]]
+
+
+def _request_analysis(client, router: ModelRouter, model: str, prompt: str, expected_count: int, request_timeout: float) -> list:
+    started_at = time.monotonic()
+    try:
+        response = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1,
+            response_format={"type": "json_object"},  # JSON 구조 완벽 강제
+            timeout=request_timeout,
+        )
+    except Exception:
+        router.record_failure(model)
+        raise
+
+    # 응답 형식 오류는 모델이 응답은 한 것이므로 서킷 브레이커 오류율에 넣지 않습니다.
+    router.record_success(model, time.monotonic() - started_at)
+    content = ""
+    try:
+        content = response.choices[0].message.content.strip()
+        return _parse_analysis_content(content, expected_count)
+    except Exception:
+        if content:
+            logger.debug("OpenRouter 원본 응답 일부: model=%s content=%s", model, content[:500])
+        raise
+
+
+def _start_attempt(results: queue.Queue, client, router: ModelRouter, model: str, prompt: str, expected_count: int, request_timeout: float) -> None:
+    def run():
+        try:
+            results.put((model, _request_analysis(client, router, model, prompt, expected_count, request_timeout), None))
+        except Exception as error:
+            results.put((model, None, error))
+
+    # daemon 스레드라서 헤지에서 진 요청이 끝나기를 기다리지 않고 프로세스가 종료됩니다.
+    threading.Thread(target=run, name=f"openrouter-{model}", daemon=True).start()
+
+
+def _request_with_hedging(client, router: ModelRouter, prompt: str, expected_count: int, request_timeout: float, hedging_enabled: bool) -> list:
+    """응답이 늦으면 다음 모델로 중복 요청을 보내고 먼저 도착한 정상 응답을 사용합니다.
+
+    헤지에서 진 요청은 결과만 버릴 뿐 OpenRouter에서는 끝까지 처리되어 비용이 청구됩니다.
+    """
+    models = router.available_models()
+    if not models:
+        raise RuntimeError("서킷 브레이커로 모든 모델이 일시 차단되었습니다.")
+
+    # 모델이 하나뿐이면 같은 모델로 한 번 더 헤지합니다.
+    plan = models * 2 if hedging_enabled and len(models) == 1 else models
+    results = queue.Queue()
+    _start_attempt(results, client, router, plan[0], prompt, expected_count, request_timeout)
+    in_flight = 1
+    next_index = 1
+    last_error = None
+
+    while in_flight:
+        hedge_delay = None
+        if hedging_enabled and next_index < len(plan):
+            hedge_delay = router.hedge_delay(plan[next_index - 1])
+
+        try:
+            model, analyzed, error = results.get(timeout=hedge_delay)
+        except queue.Empty:
+            model = plan[next_index]
+            next_index += 1
+            logger.info("OpenRouter 응답 지연으로 헤지 요청: model=%s after=%.1fs", model, hedge_delay)
+            _start_attempt(results, client, router, model, prompt, expected_count, request_timeout)
+            in_flight += 1
+            continue
+
+        in_flight -= 1
+        if error is None:
+            return analyzed
+
+        last_error = error
+        logger.debug("OpenRouter 모델 요청 실패: model=%s error_type=%s error=%s", model, type(error).__name__, error)
+        if not in_flight and next_index < len(plan):
+            model = plan[next_index]
+            next_index += 1
+            logger.info("OpenRouter 요청 실패로 다음 모델 시도: model=%s", model)
+            _start_attempt(results, client, router, model, prompt, expected_count, request_timeout)
+            in_flight += 1
+
+    raise last_error
+
+
 def analyze_comments_with_llm(comments: list, prompt_template: str) -> list:
     """OpenRouter를 사용하여 댓글의 감성과 주요 키워드를 분석합니다."""
     if not comments:
@@ -132,16 +404,19 @@ def analyze_comments_with_llm(comments: list, prompt_template: str) -> list:
         ]
 
     # 1. OpenRouter가 권장하는 필수 헤더 추가
+    # 재시도는 라우터가 다음 모델로 넘기며 처리하므로 SDK 자체 재시도는 끕니다.
     client = OpenAI(
         base_url="https://openrouter.ai/api/v1",
         api_key=api_key,
+        max_retries=0,
         default_headers={
             "HTTP-Referer": "http://localhost:8501", 
             "X-Title": "NPS_PR_Dashboard"
         }
     )
 
-    model = os.getenv("OPENROUTER_MODEL", "openai/gpt-4o-mini")
+    router = get_model_router()
+    hedging_enabled = get_bool_env("OPENROUTER_HEDGING", True)
     batch_size = get_positive_int_env("OPENROUTER_BATCH_SIZE", 10)
     request_timeout = get_positive_float_env("OPENROUTER_TIMEOUT", 60.0)
     analyzed_data = []
@@ -150,59 +425,24 @@ def analyze_comments_with_llm(comments: list, prompt_template: str) -> list:
     for i in range(0, len(comments), batch_size):
         batch = comments[i:i + batch_size]
         batch_number = i // batch_size + 1
-        logger.info("OpenRouter 배치 분석 시작: batch=%s/%s comments=%s model=%s", batch_number, total_batches, len(batch), model)
+        logger.info("OpenRouter 배치 분석 시작: batch=%s/%s comments=%s models=%s", batch_number, total_batches, len(batch), router.available_models())
 
         prompt = _build_prompt(prompt_template, batch)
-        content = ""
 
         try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                response_format={"type": "json_object"},  # JSON 구조 완벽 강제
-                timeout=request_timeout,
-            )
-
-            content = response.choices[0].message.content.strip()
-            result_dict = json.loads(content)  # 정규식 없이 깔끔하게 파싱!
-
-            # 딕셔너리 안의 리스트를 추출
-            if isinstance(result_dict, dict) and isinstance(result_dict.get("data"), list):
-                if len(result_dict["data"]) != len(batch):
-                    raise ValueError(
-                        f"반환 개수 불일치: expected={len(batch)}, actual={len(result_dict['data'])}"
-                    )
-                analyzed_data.extend(normalize_analysis_item(item) for item in result_dict["data"])
-            else:
-                raise ValueError("JSON에 리스트 형태의 'data' 키가 없습니다.")
-
+            analyzed_data.extend(_request_with_hedging(client, router, prompt, len(batch), request_timeout, hedging_enabled))
             logger.info("OpenRouter 배치 분석 완료: batch=%s/%s", batch_number, total_batches)
 
         except Exception as e:
             # 2. 대시보드에서 직접 에러 종류를 확인 가능하도록 추적 로직 강화
             error_type = type(e).__name__
             logger.warning("OpenRouter 배치 분석 실패 후 단건 재시도: batch=%s/%s error_type=%s error=%s", batch_number, total_batches, error_type, e)
-            if content:
-                logger.debug("OpenRouter 원본 응답 일부: %s", content[:500])
 
             # 배치 응답이 어긋나면 댓글 단위로 재시도해 순서를 강제합니다.
             for text in batch:
                 single_prompt = _build_prompt(prompt_template, [text])
-                single_content = ""
                 try:
-                    response = client.chat.completions.create(
-                        model=model,
-                        messages=[{"role": "user", "content": single_prompt}],
-                        temperature=0.1,
-                        response_format={"type": "json_object"},
-                        timeout=request_timeout,
-                    )
-                    single_content = response.choices[0].message.content.strip()
-                    result_dict = json.loads(single_content)
-                    if not isinstance(result_dict, dict) or not isinstance(result_dict.get("data"), list) or len(result_dict["data"]) != 1:
-                        raise ValueError("단건 재시도 결과 형식 오류")
-                    analyzed_data.append(normalize_analysis_item(result_dict["data"][0]))
+                    analyzed_data.extend(_request_with_hedging(client, router, single_prompt, 1, request_timeout, hedging_enabled))
                 except Exception as single_error:
                     single_error_type = type(single_error).__name__
                     logger.warning(
@@ -211,8 +451,6 @@ def analyze_comments_with_llm(comments: list, prompt_template: str) -> list:
                         single_error,
                         text[:80],
                     )
-                    if single_content:
-                        logger.debug("OpenRouter 단건 원본 응답 일부: %s", single_content[:500])
                     analyzed_data.append({
                         "text": text,
                         "sentiment": "오류",
@@ -220,4 +458,9 @@ def analyze_comments_with_llm(comments: list, prompt_template: str) -> list:
                         "keyword": f"에러: {single_error_type}"
                     })
 
+    router.log_latency_summary()
+    try:
+        router.save_latencies(os.getenv("OPENROUTER_LATENCY_FILE", LATENCY_FILE))
+    except OSError as error:
+        logger.warning("OpenRouter 응답 시간 기록을 저장하지 못했습니다: error=%s", error)
     return analyzed_data
@@ -0,0 +1,76 @@
+import logging
+
+import pandas as pd
+
+from comment_analyzer import CATEGORY_ALIAS_MAP, normalize_category_label, normalize_sentiment_label
+
+COMMENT_COLUMNS = ["text", "sentiment", "category", "keyword"]
+SENTIMENT_LABELS = ["긍정", "부정", "중립", "광고", "오류"]
+SENTIMENT_DTYPE = pd.CategoricalDtype(SENTIMENT_LABELS)
+CATEGORY_DTYPE = pd.CategoricalDtype(list(dict.fromkeys(CATEGORY_ALIAS_MAP.values())))
+COMMENT_CSV_DTYPES = {"text": "string", "sentiment": "category", "category": "category", "keyword": "string"}
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_label_series(series: pd.Series, normalize_label, dtype: pd.CategoricalDtype) -> pd.Series:
+    # 고유값에만 정규화 함수를 적용하고 나머지는 map으로 펼쳐 행 단위 루프를 피합니다.
+    lookup = {value: normalize_label(value) for value in series.dropna().unique()}
+    normalized = pd.Series(pd.Categorical(series.map(lookup), dtype=dtype), index=series.index)
+    return normalized.fillna(normalize_label(None))
+
+
+def normalize_sentiment_series(series: pd.Series) -> pd.Series:
+    return _normalize_label_series(series, normalize_sentiment_label, SENTIMENT_DTYPE)
+
+
+def normalize_category_series(series: pd.Series) -> pd.Series:
+    return _normalize_label_series(series, normalize_category_label, CATEGORY_DTYPE)
+
+
+def normalize_comment_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """normalize_analysis_item과 같은 규칙을 DataFrame 컬럼 단위로 적용합니다."""
+    keyword = frame["keyword"].astype("string").fillna("")
+    return pd.DataFrame(
+        {
+            "text": frame["text"].astype("string").fillna(""),
+            "sentiment": normalize_sentiment_series(frame["sentiment"]),
+            "category": normalize_category_series(frame["category"]),
+            "keyword": keyword.mask(keyword == "", "누락"),
+        }
+    )
+
+
+def read_comment_partition(partition_file):
+    partition_df = pd.read_csv(
+        partition_file,
+        usecols=lambda column: column in COMMENT_COLUMNS,
+        dtype=COMMENT_CSV_DTYPES,
+        keep_default_na=False,
+    )
+
+    missing_columns = [column for column in COMMENT_COLUMNS if column not in partition_df.columns]
+    if missing_columns:
+        logger.warning("댓글 CSV에 누락 컬럼이 있어 기본값으로 보정합니다: file=%s columns=%s", partition_file, missing_columns)
+        for column in missing_columns:
+            partition_df[column] = "" if column == "text" else "누락"
+
+    # 파티션마다 같은 categorical dtype으로 맞춰야 concat 후에도 object로 풀리지 않습니다.
+    return normalize_comment_frame(partition_df)
+
+
+def build_analyzed_frame(new_comments, analyzed_list):
+    missing_result = {"sentiment": "오류", "category": "기타", "keyword": "분석결과누락"}
+    results = [
+        result if isinstance(result, dict) and result else missing_result
+        for result in analyzed_list[:len(new_comments)]
+    ]
+    results.extend([missing_result] * (len(new_comments) - len(results)))
+
+    if len(analyzed_list) != len(new_comments):
+        logger.warning("분석 결과 개수와 신규 댓글 수가 다릅니다: comments=%s results=%s", len(new_comments), len(analyzed_list))
+
+    # LLM이 반환한 text가 변형되었을 수 있으므로 원본 댓글을 기준으로 저장합니다.
+    analyzed_df = pd.DataFrame.from_records(results, columns=["sentiment", "category", "keyword"])
+    analyzed_df.insert(0, "text", new_comments)
+    return normalize_comment_frame(analyzed_df)
@@ -6,6 +6,8 @@ CONFIG_FILE = "dashboard_config.json"
 ANALYZED_COMMENTS_DIR = Path("analyzed_comments")
 PROMPT_DIR = Path("prompt")
 VIDEO_STATS_DIR = Path("video_stats")
+SEARCH_INDEX_DIR = Path("search_index")
+PARTITION_MANIFEST_FILE = "manifest.json"
 
 
 def load_dashboard_config(path: str = CONFIG_FILE) -> dict:
@@ -65,5 +67,51 @@ def data_file_for_report(report: dict) -> str:
     return str(ANALYZED_COMMENTS_DIR / f"analyzed_comments_{report['start_date']}.csv")
 
 
+def parquet_file_for_report(report: dict) -> str:
+    return str(ANALYZED_COMMENTS_DIR / f"analyzed_comments_{report['start_date']}.parquet")
+
+
 def stats_file_for_report(report: dict) -> str:
     return str(VIDEO_STATS_DIR / f"video_stats_{report['start_date']}.csv")
+
+
+def search_index_dir_for_report(report: dict) -> str:
+    return str(SEARCH_INDEX_DIR / report["start_date"])
+
+
+def partition_dir_for_file(base_file: str) -> Path:
+    return Path(base_file).with_suffix("")
+
+
+def manifest_file_for(base_file: str) -> str:
+    return str(partition_dir_for_file(base_file) / PARTITION_MANIFEST_FILE)
+
+
+def partition_file_for(base_file: str, partition_key: str) -> str:
+    return (partition_dir_for_file(base_file) / f"{partition_key}.csv").as_posix()
+
+
+def load_partition_manifest(base_file: str) -> dict:
+    """manifest가 없으면 기존 단일 CSV를 첫 파티션으로 간주합니다."""
+    manifest_file = manifest_file_for(base_file)
+    if Path(manifest_file).exists():
+        with open(manifest_file, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+        manifest.setdefault("partitions", [])
+        return manifest
+
+    partitions = [Path(base_file).as_posix()] if Path(base_file).exists() else []
+    return {"partitions": partitions}
+
+
+def save_partition_manifest(base_file: str, manifest: dict) -> None:
+    manifest_file = Path(manifest_file_for(base_file))
+    manifest_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(manifest_file, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+        file.write("\n")
+
+
+def resolve_partition_files(base_file: str) -> list[str]:
+    manifest = load_partition_manifest(base_file)
+    return [path for path in manifest["partitions"] if Path(path).exists()]
@@ -1,20 +1,21 @@
 import argparse
-import csv
+import importlib.util
 from collections import Counter
-from pathlib import Path
 
-from comment_analyzer import (
-    analyze_comments_with_llm,
-    normalize_category_label,
-    normalize_sentiment_label,
-)
+import pandas as pd
+
+from comment_analyzer import analyze_comments_with_llm
+from comment_frame import build_analyzed_frame, read_comment_partition
 from config_loader import (
     data_file_for_report,
     get_default_report,
     get_report_by_id,
     load_dashboard_config,
+    parquet_file_for_report,
+    resolve_partition_files,
     resolve_prompt_file,
 )
+from search_index import update_report_index
 
 
 def parse_args() -> argparse.Namespace:
@@ -26,44 +27,44 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="LLM 재호출 없이 기존 category 값을 공통 체계로 정규화합니다.",
     )
+    parser.add_argument(
+        "--export-parquet",
+        action="store_true",
+        help="처리 후 모든 파티션을 합친 Parquet 파일을 함께 만듭니다. pyarrow가 필요합니다.",
+    )
     return parser.parse_args()
 
-def write_rows(data_file: str, rows: list[dict]) -> None:
-    with open(data_file, "w", encoding="utf-8", newline="") as file:
-        writer = csv.DictWriter(file, fieldnames=["text", "sentiment", "category", "keyword"])
-        writer.writeheader()
-        writer.writerows(rows)
-
+def normalize_existing_rows(partition_files: list[str]) -> pd.DataFrame:
+    normalized_frames = []
+    for partition_file in partition_files:
+        partition_df = read_comment_partition(partition_file)
+        partition_df.to_csv(partition_file, index=False)
+        normalized_frames.append(partition_df)
 
-def normalize_existing_rows(data_file: str) -> list[dict]:
-    with open(data_file, "r", encoding="utf-8") as file:
-        rows = list(csv.DictReader(file))
+    return pd.concat(normalized_frames, ignore_index=True)
 
-    normalized_rows = []
-    for row in rows:
-        normalized_rows.append(
-            {
-                "text": row.get("text", ""),
-                "sentiment": normalize_sentiment_label(row.get("sentiment")),
-                "category": normalize_category_label(row.get("category")),
-                "keyword": row.get("keyword", "누락") or "누락",
-            }
-        )
 
-    write_rows(data_file, normalized_rows)
-    return normalized_rows
+def export_parquet(report: dict, comments_df: pd.DataFrame) -> str:
+    parquet_file = parquet_file_for_report(report)
+    # categorical 컬럼은 Arrow dictionary 타입으로 저장됩니다.
+    comments_df.to_parquet(parquet_file, index=False)
+    return parquet_file
 
 
-def analyze_report(report: dict, config: dict, normalize_only: bool = False) -> None:
+def analyze_report(report: dict, config: dict, normalize_only: bool = False, parquet: bool = False) -> None:
     data_file = data_file_for_report(report)
-    if not Path(data_file).exists():
+    partition_files = resolve_partition_files(data_file)
+    if not partition_files:
         raise FileNotFoundError(f"댓글 파일을 찾지 못했습니다: {data_file}")
 
     if normalize_only:
-        final_rows = normalize_existing_rows(data_file)
+        final_rows = normalize_existing_rows(partition_files)
+        update_report_index(report, data_file, partition_files)
         print(f"normalized {len(final_rows)} comments in {data_file} ({report.get('id')})")
-        print("sentiment:", Counter(row["sentiment"] for row in final_rows))
-        print("category:", Counter(row["category"] for row in final_rows))
+        print("sentiment:", Counter(final_rows["sentiment"]))
+        print("category:", Counter(final_rows["category"]))
+        if parquet:
+            print(f"exported {export_parquet(report, final_rows)}")
         return
 
     prompt_file = resolve_prompt_file(report, config)
@@ -71,33 +72,33 @@ def analyze_report(report: dict, config: dict, normalize_only: bool = False) ->
     with open(prompt_file, "r", encoding="utf-8") as file:
         prompt_template = file.read()
 
-    with open(data_file, "r", encoding="utf-8") as file:
-        rows = list(csv.DictReader(file))
-
-    comments = [row["text"] for row in rows if row.get("text")]
-    analyzed_rows = analyze_comments_with_llm(comments, prompt_template)
+    # 파티션 경계를 기억해 두었다가 분석 결과를 원래 파티션 파일에 나눠 씁니다.
+    partition_comments = []
+    for partition_file in partition_files:
+        texts = read_comment_partition(partition_file)["text"]
+        partition_comments.append((partition_file, texts[texts != ""].tolist()))
 
-    final_rows = []
-    for index, comment in enumerate(comments):
-        analyzed = analyzed_rows[index] if index < len(analyzed_rows) else {}
-        final_rows.append(
-            {
-                "text": comment,
-                "sentiment": normalize_sentiment_label(analyzed.get("sentiment", "오류")),
-                "category": normalize_category_label(analyzed.get("category", "기타")),
-                "keyword": analyzed.get("keyword", "누락"),
-            }
-        )
+    comments = [comment for _, partition in partition_comments for comment in partition]
+    final_rows = build_analyzed_frame(comments, analyze_comments_with_llm(comments, prompt_template))
 
-    write_rows(data_file, final_rows)
+    offset = 0
+    for partition_file, partition in partition_comments:
+        final_rows.iloc[offset:offset + len(partition)].to_csv(partition_file, index=False)
+        offset += len(partition)
 
+    update_report_index(report, data_file, partition_files)
     print(f"re-analyzed {len(final_rows)} comments in {data_file} ({report.get('id')})")
-    print("sentiment:", Counter(row["sentiment"] for row in final_rows))
-    print("category:", Counter(row["category"] for row in final_rows))
+    print("sentiment:", Counter(final_rows["sentiment"]))
+    print("category:", Counter(final_rows["category"]))
+    if parquet:
+        print(f"exported {export_parquet(report, final_rows)}")
 
 
 def main() -> None:
     args = parse_args()
+    # CSV를 고쳐 쓰기 전에 확인해야 pyarrow가 없을 때 파일만 바뀐 채 실패하지 않습니다.
+    if args.export_parquet and importlib.util.find_spec("pyarrow") is None:
+        raise SystemExit("Parquet로 내보내려면 pyarrow 패키지가 필요합니다: pip install pyarrow")
     config = load_dashboard_config()
 
     if args.all:
@@ -109,7 +110,7 @@ def main() -> None:
         reports = [report]
 
     for report in reports:
-        analyze_report(report, config, normalize_only=args.normalize_only)
+        analyze_report(report, config, normalize_only=args.normalize_only, parquet=args.export_parquet)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,152 @@
+import csv
+import json
+import logging
+import re
+import shutil
+import unicodedata
+from pathlib import Path
+
+from config_loader import SEARCH_INDEX_DIR, resolve_partition_files, search_index_dir_for_report
+
+INDEX_VERSION = 4
+MAX_SHARD_COUNT = 16
+DOCS_PER_SHARD = 64
+NGRAM_SIZE = 2
+POSTING_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+INDEX_MANIFEST_FILE = SEARCH_INDEX_DIR / "manifest.json"
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+logger = logging.getLogger(__name__)
+
+
+def tokenize(text: str | None) -> list[str]:
+    if not isinstance(text, str):
+        return []
+    return TOKEN_PATTERN.findall(unicodedata.normalize("NFKC", text).lower())
+
+
+def ngrams(token: str, size: int = NGRAM_SIZE) -> set[str]:
+    """한 글자 term도 함께 만들어 '돈' 같은 한 글자 검색어가 '돈을', '돈이' 안에서도 찾아지게 합니다."""
+    terms = set(token)
+    terms.update(token[index:index + size] for index in range(len(token) - size + 1))
+    return terms
+
+
+def terms_for_row(text: str | None, keyword: str | None) -> set[str]:
+    """댓글 본문은 글자 n-gram으로, 키워드 컬럼은 '#' 접두어를 붙인 통째 값으로 색인합니다."""
+    terms = set()
+    for token in tokenize(text):
+        terms.update(ngrams(token))
+    keyword_value = "".join(tokenize(keyword))
+    if keyword_value:
+        terms.add(f"#{keyword_value}")
+    return terms
+
+
+def shard_for_term(term: str, shard_count: int) -> int:
+    """FNV-1a 해시입니다. index.html의 shardForTerm과 같은 값을 내야 합니다."""
+    value = 2166136261
+    for char in term:
+        value ^= ord(char)
+        value = (value * 16777619) & 0xFFFFFFFF
+    return value % shard_count
+
+
+def shard_count_for(docs: int) -> int:
+    # 하루치 파티션처럼 작은 segment는 shard 하나로 두어 실행마다 다시 쓰는 파일 수를 줄입니다.
+    shard_count = 1
+    while shard_count < MAX_SHARD_COUNT and docs > shard_count * DOCS_PER_SHARD:
+        shard_count *= 2
+    return shard_count
+
+
+def encode_postings(row_ids: list[int]) -> str:
+    """행 번호를 앞 번호와의 차이로 바꾼 뒤, 한 글자에 5비트씩 담는 가변 길이 문자열로 만듭니다."""
+    chars = []
+    previous = 0
+    for row_id in row_ids:
+        value = row_id - previous
+        previous = row_id
+        while value >= 32:
+            chars.append(POSTING_ALPHABET[32 | (value & 31)])
+            value >>= 5
+        chars.append(POSTING_ALPHABET[value])
+    return "".join(chars)
+
+
+def write_text(path: Path, text: str) -> None:
+    with open(path, "w", encoding="utf-8", newline="\n") as file:
+        file.write(text)
+
+
+def build_segment(partition_file: str, segment_dir: Path) -> dict:
+    """파티션 CSV 하나를 읽어 shard별 postings 파일을 다시 만듭니다."""
+    with open(partition_file, "r", encoding="utf-8", newline="") as file:
+        rows = list(csv.DictReader(file))
+
+    postings = {}
+    for row_index, row in enumerate(rows):
+        for term in terms_for_row(row.get("text"), row.get("keyword")):
+            postings.setdefault(term, []).append(row_index)
+
+    shard_count = shard_count_for(len(rows))
+    shards = {}
+    for term, row_ids in postings.items():
+        shards.setdefault(shard_for_term(term, shard_count), []).append(f"{term}\t{encode_postings(row_ids)}")
+
+    if segment_dir.exists():
+        shutil.rmtree(segment_dir)
+    segment_dir.mkdir(parents=True)
+    for shard_id, lines in shards.items():
+        write_text(segment_dir / f"shard_{shard_id:02d}.txt", "\n".join(sorted(lines)) + "\n")
+
+    return {"partition": partition_file, "docs": len(rows), "shard_count": shard_count, "shards": sorted(shards)}
+
+
+def load_index_manifest() -> dict:
+    empty_manifest = {"version": INDEX_VERSION, "ngram_size": NGRAM_SIZE, "reports": {}}
+    if not INDEX_MANIFEST_FILE.exists():
+        return empty_manifest
+
+    with open(INDEX_MANIFEST_FILE, "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+
+    # 색인 규칙이 바뀌었으면 기존 segment를 재사용하지 않고 전부 다시 만듭니다.
+    if any(manifest.get(key) != empty_manifest[key] for key in ("version", "ngram_size")):
+        logger.info("검색 색인 설정이 바뀌어 전체 색인을 다시 만듭니다.")
+        return empty_manifest
+    return manifest
+
+
+def save_index_manifest(manifest: dict) -> None:
+    INDEX_MANIFEST_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(INDEX_MANIFEST_FILE, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def update_report_index(report: dict, data_file: str, changed_partitions: list[str] | None = None) -> dict:
+    """바뀐 파티션과 아직 색인이 없는 파티션만 다시 색인합니다."""
+    changed_partitions = set(changed_partitions or [])
+    manifest = load_index_manifest()
+    report_id = report.get("id", report["start_date"])
+    previous_segments = manifest["reports"].get(report_id, {}).get("segments", {})
+    index_dir = Path(search_index_dir_for_report(report))
+
+    segments = {}
+    for partition_file in resolve_partition_files(data_file):
+        segment_key = Path(partition_file).stem
+        segment = previous_segments.get(segment_key)
+        if segment is None or partition_file in changed_partitions or not (index_dir / segment_key).exists():
+            segment = build_segment(partition_file, index_dir / segment_key)
+            logger.debug("검색 색인 segment 갱신: report=%s segment=%s docs=%s", report_id, segment_key, segment["docs"])
+        segments[segment_key] = segment
+
+    if index_dir.exists():
+        for stale_dir in index_dir.iterdir():
+            if stale_dir.is_dir() and stale_dir.name not in segments:
+                shutil.rmtree(stale_dir)
+
+    manifest["reports"][report_id] = {"index_dir": index_dir.as_posix(), "segments": segments}
+    save_index_manifest(manifest)
+    return manifest["reports"][report_id]
@@ -1,22 +1,27 @@
 import logging
 import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
 import pandas as pd
 
 from comment_collector import fetch_youtube_comments, fetch_video_stats
-from comment_analyzer import (
-    analyze_comments_with_llm,
-    normalize_category_label,
-    normalize_sentiment_label,
-)
+from comment_analyzer import analyze_comments_with_llm
+from comment_frame import COMMENT_COLUMNS, build_analyzed_frame, normalize_comment_frame, read_comment_partition
 from config_loader import (
     get_collectable_reports,
     load_dashboard_config,
+    load_partition_manifest,
+    partition_file_for,
+    resolve_partition_files,
     resolve_prompt_file,
+    save_partition_manifest,
     data_file_for_report,
     stats_file_for_report,
 )
+from search_index import update_report_index
 
-COMMENT_COLUMNS = ["text", "sentiment", "category", "keyword"]
+STATS_COLUMNS = ["timestamp", "view_count", "like_count", "comment_count", "title"]
 logger = logging.getLogger(__name__)
 
 
@@ -33,10 +38,9 @@ def normalize(text):
 
 
 def build_initial_stats_frame(report, title):
-    columns = ["timestamp", "view_count", "like_count", "comment_count", "title"]
     start_at = report.get("video_start_at")
     if not start_at:
-        return pd.DataFrame(columns=columns)
+        return pd.DataFrame(columns=STATS_COLUMNS)
 
     return pd.DataFrame(
         [
@@ -48,7 +52,7 @@ def build_initial_stats_frame(report, title):
                 "title": title,
             }
         ],
-        columns=columns,
+        columns=STATS_COLUMNS,
     )
 
 
@@ -58,41 +62,33 @@ def ensure_parent_directory(file_path):
         os.makedirs(directory, exist_ok=True)
 
 
-def load_existing_comments(data_file):
-    if os.path.exists(data_file):
-        existing_df = pd.read_csv(data_file)
-    else:
-        existing_df = pd.DataFrame(columns=COMMENT_COLUMNS)
-        existing_df.to_csv(data_file, index=False)
-        logger.info("댓글 CSV가 없어 새로 생성했습니다: %s", data_file)
+def current_partition_key():
+    return datetime.now(ZoneInfo("Asia/Seoul")).strftime("%Y%m%d")
 
-    missing_columns = [column for column in COMMENT_COLUMNS if column not in existing_df.columns]
-    if missing_columns:
-        logger.warning("댓글 CSV에 누락 컬럼이 있어 기본값으로 보정합니다: file=%s columns=%s", data_file, missing_columns)
-        for column in missing_columns:
-            existing_df[column] = "" if column == "text" else "누락"
 
-    return existing_df[COMMENT_COLUMNS]
+def append_partition_rows(base_file, new_df, columns):
+    """오늘 날짜 파티션에만 행을 추가해 지난 파티션 파일은 다시 쓰지 않습니다."""
+    manifest = load_partition_manifest(base_file)
+    partition_file = partition_file_for(base_file, current_partition_key())
+    ensure_parent_directory(partition_file)
 
+    file_exists = os.path.exists(partition_file)
+    new_df.reindex(columns=columns).to_csv(partition_file, mode="a", header=not file_exists, index=False)
+
+    if partition_file not in manifest["partitions"]:
+        manifest["partitions"].append(partition_file)
+    save_partition_manifest(base_file, manifest)
+    return partition_file
 
-def build_analyzed_rows(new_comments, analyzed_list):
-    final_data = []
-    for index, comment in enumerate(new_comments):
-        result = analyzed_list[index] if index < len(analyzed_list) else {}
-        if isinstance(result, dict) and result:
-            item = result.copy()
-        else:
-            item = {"sentiment": "오류", "category": "기타", "keyword": "분석결과누락"}
-        item["text"] = comment
-        item["sentiment"] = normalize_sentiment_label(item.get("sentiment"))
-        item["category"] = normalize_category_label(item.get("category"))
-        item["keyword"] = item.get("keyword", "누락") or "누락"
-        final_data.append(item)
 
-    if len(analyzed_list) != len(new_comments):
-        logger.warning("분석 결과 개수와 신규 댓글 수가 다릅니다: comments=%s results=%s", len(new_comments), len(analyzed_list))
+def load_existing_comments(data_file):
+    partition_files = resolve_partition_files(data_file)
+    if partition_files:
+        return pd.concat([read_comment_partition(path) for path in partition_files], ignore_index=True)
 
-    return final_data
+    save_partition_manifest(data_file, {"partitions": []})
+    logger.info("댓글 파티션이 없어 빈 manifest를 새로 생성했습니다: %s", data_file)
+    return normalize_comment_frame(pd.DataFrame(columns=COMMENT_COLUMNS))
 
 
 def run_update_for_report(report, config):
@@ -111,14 +107,12 @@ def run_update_for_report(report, config):
     try:
         stats = fetch_video_stats(video_url)
         if stats:
-            if os.path.exists(stats_file):
-                df_stats = pd.read_csv(stats_file)
-            else:
-                df_stats = build_initial_stats_frame(report, stats.get("title") or report.get("video_title", ""))
-
-            new_row = pd.DataFrame([stats])
-            df_stats = pd.concat([df_stats, new_row], ignore_index=True)
-            df_stats.to_csv(stats_file, index=False)
+            new_rows = pd.DataFrame([stats])
+            if not resolve_partition_files(stats_file):
+                initial_df = build_initial_stats_frame(report, stats.get("title") or report.get("video_title", ""))
+                new_rows = pd.concat([initial_df, new_rows], ignore_index=True)
+
+            append_partition_rows(stats_file, new_rows, STATS_COLUMNS)
             logger.info("[%s] 영상 통계 업데이트 완료: views=%s likes=%s comments=%s", report_id, stats["view_count"], stats["like_count"], stats["comment_count"])
         else:
             logger.warning("[%s] 영상 통계를 가져오지 못했습니다.", report_id)
@@ -149,18 +143,17 @@ def run_update_for_report(report, config):
 
     logger.info("[%s] 댓글 비교 완료: fetched=%s existing=%s new=%s", report_id, len(raw_comments), len(existing_normalized), len(new_comments))
 
+    changed_partitions = []
     if new_comments and os.path.exists(prompt_file):
         with open(prompt_file, "r", encoding="utf-8") as file:
             prompt_template = file.read()
 
         analyzed_list = analyze_comments_with_llm(new_comments, prompt_template)
         if analyzed_list:
-            # LLM이 반환한 text가 변형되었을 수 있으므로 원본 댓글을 기준으로 저장합니다.
-            final_data = build_analyzed_rows(new_comments, analyzed_list)
-            new_df = pd.DataFrame(final_data)
-            updated_df = pd.concat([existing_df, new_df], ignore_index=True)
-            updated_df.to_csv(data_file, index=False)
-            logger.info("[%s] 새 댓글 %s개 분석 및 저장 완료.", report_id, len(new_comments))
+            new_df = build_analyzed_frame(new_comments, analyzed_list)
+            partition_file = append_partition_rows(data_file, new_df, COMMENT_COLUMNS)
+            changed_partitions.append(partition_file)
+            logger.info("[%s] 새 댓글 %s개 분석 및 저장 완료: partition=%s", report_id, len(new_comments), partition_file)
         else:
             logger.error("[%s] 신규 댓글이 있었지만 분석 결과가 비어 있습니다.", report_id)
             return False
@@ -170,6 +163,14 @@ def run_update_for_report(report, config):
     else:
         logger.info("[%s] 분석할 새로운 댓글이 없습니다.", report_id)
 
+    # 3. 검색 색인 갱신
+    try:
+        report_index = update_report_index(report, data_file, changed_partitions)
+        logger.info("[%s] 검색 색인 갱신 완료: segments=%s changed=%s", report_id, len(report_index["segments"]), len(changed_partitions))
+    except Exception:
+        logger.exception("[%s] 검색 색인 갱신 중 오류가 발생했습니다.", report_id)
+        report_failed = True
+
     return not report_failed
 
 